@@ -1,9 +1,11 @@
 """Batch analysis to compare random vs evolutionary approaches."""
 import os
-import statistics
+
+import numpy as np
 
 from generator import collect_valid_layouts, summarize
 from evolution import evolutionary_search, score_layout
+from geometry import TYPE_CODES, Layout
 
 
 def analyze_approach(name: str, layouts, output_dir: str):
@@ -16,36 +18,39 @@ def analyze_approach(name: str, layouts, output_dir: str):
         print("  No layouts generated!")
         return
     
-    scores = [score_layout(layout) for layout in layouts]
-    building_counts = [len(layout) for layout in layouts]
-    areas = [sum(r["w"] * r["h"] for r in layout) for layout in layouts]
+    soas = [Layout.from_dicts(layout) for layout in layouts]
+    scores = np.asarray([score_layout(layout) for layout in layouts])
+    building_counts = np.fromiter((len(soa) for soa in soas), dtype=int, count=len(soas))
+    areas = np.fromiter((float((soa.xywh[:, 2] * soa.xywh[:, 3]).sum()) for soa in soas), dtype=float, count=len(soas))
     
-    tower_a_counts = [sum(1 for r in layout if r["type"] == "A") for layout in layouts]
-    tower_b_counts = [sum(1 for r in layout if r["type"] == "B") for layout in layouts]
+    tower_a_counts = np.fromiter(
+        (np.count_nonzero(soa.types == TYPE_CODES["A"]) for soa in soas), dtype=int, count=len(soas)
+    )
+    tower_b_counts = building_counts - tower_a_counts
     
     print(f"  Layouts generated: {len(layouts)}")
     print(f"\n  Quality Score:")
-    print(f"    Mean:   {statistics.mean(scores):.1f}")
-    print(f"    Median: {statistics.median(scores):.1f}")
-    print(f"    Max:    {max(scores):.1f}")
-    print(f"    Min:    {min(scores):.1f}")
-    print(f"    StdDev: {statistics.stdev(scores) if len(scores) > 1 else 0:.1f}")
+    print(f"    Mean:   {scores.mean():.1f}")
+    print(f"    Median: {np.median(scores):.1f}")
+    print(f"    Max:    {scores.max():.1f}")
+    print(f"    Min:    {scores.min():.1f}")
+    print(f"    StdDev: {scores.std(ddof=1) if len(scores) > 1 else 0:.1f}")
     
     print(f"\n  Buildings per Layout:")
-    print(f"    Mean:   {statistics.mean(building_counts):.1f}")
-    print(f"    Median: {statistics.median(building_counts):.1f}")
-    print(f"    Max:    {max(building_counts)}")
-    print(f"    Min:    {min(building_counts)}")
+    print(f"    Mean:   {building_counts.mean():.1f}")
+    print(f"    Median: {np.median(building_counts):.1f}")
+    print(f"    Max:    {building_counts.max()}")
+    print(f"    Min:    {building_counts.min()}")
     
     print(f"\n  Built Area (m²):")
-    print(f"    Mean:   {statistics.mean(areas):.0f}")
-    print(f"    Max:    {max(areas):.0f}")
-    print(f"    Min:    {min(areas):.0f}")
+    print(f"    Mean:   {areas.mean():.0f}")
+    print(f"    Max:    {areas.max():.0f}")
+    print(f"    Min:    {areas.min():.0f}")
     
     print(f"\n  Tower Mix:")
-    print(f"    Avg Tower A: {statistics.mean(tower_a_counts):.1f}")
-    print(f"    Avg Tower B: {statistics.mean(tower_b_counts):.1f}")
-    print(f"    A/B Ratio:   {statistics.mean(tower_a_counts) / statistics.mean(tower_b_counts):.2f}")
+    print(f"    Avg Tower A: {tower_a_counts.mean():.1f}")
+    print(f"    Avg Tower B: {tower_b_counts.mean():.1f}")
+    print(f"    A/B Ratio:   {tower_a_counts.mean() / tower_b_counts.mean():.2f}")
 
 
 def main():
@@ -73,13 +78,14 @@ def main():
     if random_layouts:
         print("\n[2/2] Running evolutionary optimization...")
         initial_pool = random_layouts[:10]  # Use 10 as starting points
-        evolved_layouts = evolutionary_search(
+        evolved_scored = evolutionary_search(
             count=20,
             initial_pool=initial_pool * 2,  # Duplicate to have enough
             generations=120,
             population_size=25,
             mutation_rate=0.3,
         )
+        evolved_layouts = [layout for _, layout in evolved_scored]
         
         analyze_approach("Evolutionary Optimization Results", evolved_layouts, output_dir)
         
@@ -89,11 +95,11 @@ def main():
             print("COMPARISON")
             print(f"{'='*70}")
             
-            random_avg_score = statistics.mean([score_layout(l) for l in random_layouts])
-            evolved_avg_score = statistics.mean([score_layout(l) for l in evolved_layouts])
+            random_avg_score = np.mean([score_layout(l) for l in random_layouts])
+            evolved_avg_score = np.mean([score for score, _ in evolved_scored])
             
-            random_avg_buildings = statistics.mean([len(l) for l in random_layouts])
-            evolved_avg_buildings = statistics.mean([len(l) for l in evolved_layouts])
+            random_avg_buildings = np.mean([len(l) for l in random_layouts])
+            evolved_avg_buildings = np.mean([len(l) for l in evolved_layouts])
             
             improvement_score = ((evolved_avg_score - random_avg_score) / random_avg_score) * 100
             improvement_buildings = ((evolved_avg_buildings - random_avg_buildings) / random_avg_buildings) * 100
@@ -1,4 +1,8 @@
 """Create comparison visualization between approaches."""
+import matplotlib
+
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import os
 
@@ -41,14 +45,13 @@ def create_comparison():
         return
     
     random_layout = random_layouts[0]
-    evolved_layout = evolved[0]
+    evolved_score, evolved_layout = evolved[0]
     
     # Get stats
     random_stats = summarize(random_layout)
     evolved_stats = summarize(evolved_layout)
     
     random_score = score_layout(random_layout)
-    evolved_score = score_layout(evolved_layout)
     
     # Create side-by-side visualization
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(18, 7))
@@ -63,7 +66,7 @@ def create_comparison():
         ax.set_xlim(0, SITE_WIDTH)
         ax.set_ylim(0, SITE_HEIGHT)
         ax.set_aspect("equal")
-        ax.set_title(f"{title}\nScore: {score:.1f} | Buildings: {len(layout)} | Area: {stats['area']:.0f} m²", fontsize=12, fontweight='bold')
+        ax.set_title(f"{title}\nScore: {score:.1f} | Buildings: {len(layout)} | Area: {stats.area:.0f} m²", fontsize=12, fontweight='bold')
         
         # Site
         site_patch = Rectangle((0, 0), SITE_WIDTH, SITE_HEIGHT, fill=False, lw=2, color="#222")
@@ -1,91 +1,155 @@
 """Evolutionary optimizer for layout generation."""
-import copy
 import math
+import multiprocessing
 import random
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from config import BUILDING_TYPES, MIN_SPACING, NEIGHBOR_RADIUS, SETBACK, SITE_HEIGHT, SITE_WIDTH
-from geometry import inside_site, intersects_plaza, layout_valid, spacing_ok
+from geometry import (
+    TYPE_CODES,
+    TYPE_NAMES,
+    Layout,
+    affected_rules_ok,
+    inside_site,
+    intersects_plaza,
+    layout_reductions,
+    layout_valid_fast,
+    spacing_ok,
+)
+from generator import rng, seed_rng
 
 Rect = Dict[str, float]
 
+INVALID_SCORE = -1000.0
+NEIGHBOR_RADIUS_SQ = NEIGHBOR_RADIUS * NEIGHBOR_RADIUS
+
 
 def score_layout(layout: List[Rect]) -> float:
     """Score a layout based on multiple objectives (higher is better)."""
-    validation = layout_valid(layout, NEIGHBOR_RADIUS)
+    if not layout_valid_fast(layout, NEIGHBOR_RADIUS):
+        return INVALID_SCORE  # Heavily penalize invalid layouts
+    
+    return _objective(Layout.from_dicts(layout))
+
+
+def _rect_key(layout: List[Rect]) -> Tuple:
+    """Order-independent hashable key for a layout; scores don't depend on rect order."""
+    return tuple(sorted((r["x"], r["y"], r["w"], r["h"], r["type"]) for r in layout))
+
+
+@lru_cache(maxsize=8192)
+def _score_cached(key: Tuple) -> float:
+    """``score_layout`` memoized per process on ``_rect_key``, so elites that persist across runs are scored once."""
+    return score_layout([{"x": x, "y": y, "w": w, "h": h, "type": t} for x, y, w, h, t in key])
+
+
+def score_layout_incremental(layout: List[Rect], base_score: float, affected: Optional[List[int]]) -> float:
+    """Score a child of a parent scored ``base_score``, rechecking only rules that touch ``affected``.
+    
+    ``affected`` lists the indices that moved or were appended; None means the
+    change was structural (a type swap) and forces a full rescore, as does an
+    invalid parent.
+    """
+    if affected is None or base_score <= INVALID_SCORE:
+        return score_layout(layout)
+    if not affected:
+        return base_score
     
-    if not validation["all"]:
-        return -1000.0  # Heavily penalize invalid layouts
+    soa = Layout.from_dicts(layout)
+    if not affected_rules_ok(soa, sorted(set(affected)), NEIGHBOR_RADIUS):
+        return INVALID_SCORE
+    return _objective(soa)
+
+
+def _objective(soa: Layout) -> float:
+    """Weighted objective of a layout already known to be valid."""
+    # All per-rect reductions come from a single pass over the arrays
+    area_score, x_spread, y_spread, count_a = layout_reductions(soa)
     
     # Scoring components
-    count_score = len(layout) * 100  # Reward more buildings
-    area_score = sum(r["w"] * r["h"] for r in layout)  # Total built area
+    count_score = len(soa) * 100  # Reward more buildings
     
     # Distribution bonus: reward layouts that use space well
-    if layout:
-        xs = [r["x"] + r["w"]/2 for r in layout]
-        ys = [r["y"] + r["h"]/2 for r in layout]
-        x_spread = max(xs) - min(xs) if xs else 0
-        y_spread = max(ys) - min(ys) if ys else 0
-        distribution_score = (x_spread + y_spread) / 2
-    else:
-        distribution_score = 0
+    distribution_score = (x_spread + y_spread) / 2
     
     # Balance Tower A and Tower B (relaxed - allow more A as long as neighbor rule is satisfied)
-    count_a = sum(1 for r in layout if r["type"] == "A")
-    count_b = sum(1 for r in layout if r["type"] == "B")
+    count_b = len(soa) - count_a
     balance_penalty = max(0, count_a - count_b - 3) * 15  # Allow up to 3 more A than B
     
     total_score = count_score + area_score * 0.1 + distribution_score * 0.5 - balance_penalty
     return total_score
 
 
-def mutate_layout(layout: List[Rect], mutation_rate: float = 0.3) -> List[Rect]:
-    """Apply random mutations to a layout."""
-    mutated = copy.deepcopy(layout)
+def _layout_key(layout: List[Rect]) -> bytes:
+    """Content key for a layout, used to memoize scores within one evolution run."""
+    soa = Layout.from_dicts(layout)
+    return soa.xywh.tobytes() + soa.types.tobytes()
+
+
+def mutate_layout(layout: List[Rect], mutation_rate: float = 0.3) -> Tuple[List[Rect], Optional[List[int]]]:
+    """Apply random mutations to a layout.
     
-    if not mutated:
-        return mutated
+    Returns the mutated copy and the indices of rects that moved, or None for
+    the indices when a building type was swapped.
+    """
+    if not layout:
+        return [r.copy() for r in layout], []
     
-    # Mutation operations
-    for rect in mutated:
-        if random.random() < mutation_rate:
-            # Small position shift
-            dx = random.uniform(-10, 10)
-            dy = random.uniform(-10, 10)
-            rect["x"] = max(SETBACK, min(rect["x"] + dx, SITE_WIDTH - SETBACK - rect["w"]))
-            rect["y"] = max(SETBACK, min(rect["y"] + dy, SITE_HEIGHT - SETBACK - rect["h"]))
+    soa = Layout.from_dicts(layout)
+    xywh = soa.xywh.copy()
+    types = soa.types.copy()
+    n = len(types)
+    
+    # Mutation operations: small position shift for a random subset of rects
+    moved = rng.random(n) < mutation_rate
+    deltas = rng.uniform(-10, 10, size=(n, 2))
+    xywh[:, :2] += deltas * moved[:, None]
+    np.clip(xywh[:, 0], SETBACK, SITE_WIDTH - SETBACK - xywh[:, 2], out=xywh[:, 0])
+    np.clip(xywh[:, 1], SETBACK, SITE_HEIGHT - SETBACK - xywh[:, 3], out=xywh[:, 1])
+    
+    affected: Optional[List[int]] = np.flatnonzero(moved).tolist()
     
     # Occasionally swap a building type
-    if random.random() < mutation_rate * 0.5 and mutated:
-        idx = random.randint(0, len(mutated) - 1)
-        old_type = mutated[idx]["type"]
-        new_type = "B" if old_type == "A" else "A"
+    if rng.random() < mutation_rate * 0.5:
+        idx = int(rng.integers(n))
+        new_type = "B" if TYPE_NAMES[types[idx]] == "A" else "A"
         dims = BUILDING_TYPES[new_type]
-        mutated[idx]["w"] = dims["w"]
-        mutated[idx]["h"] = dims["h"]
-        mutated[idx]["type"] = new_type
+        xywh[idx, 2] = dims["w"]
+        xywh[idx, 3] = dims["h"]
+        types[idx] = TYPE_CODES[new_type]
+        affected = None
     
-    return mutated
+    return Layout(xywh, types).to_dicts(), affected
 
 
 def try_add_building(layout: List[Rect], attempts: int = 50) -> Optional[List[Rect]]:
     """Try to add one more building with boundary-first strategy for Tower A."""
-    new_layout = copy.deepcopy(layout)
+    new_layout = [r.copy() for r in layout]
     
-    # Count existing buildings
-    count_a = sum(1 for r in layout if r["type"] == "A")
-    count_b = sum(1 for r in layout if r["type"] == "B")
+    # Partition centers by type in one pass over the arrays
+    soa = Layout.from_dicts(layout)
+    cx, cy = soa.centers()
+    is_a = soa.types == TYPE_CODES["A"]
+    count_a = int(np.count_nonzero(is_a))
+    count_b = len(soa) - count_a
     
     # Find all Tower A locations that need Tower B coverage
-    tower_a_centers = [(r["x"] + r["w"]/2, r["y"] + r["h"]/2) for r in layout if r["type"] == "A"]
-    tower_b_centers = [(r["x"] + r["w"]/2, r["y"] + r["h"]/2) for r in layout if r["type"] == "B"]
+    tower_a_centers = list(zip(cx[is_a].tolist(), cy[is_a].tolist()))
     
-    # Check if any Tower A needs a closer Tower B
+    # Check if any Tower A needs a closer Tower B. With B centers sorted by x,
+    # only the window |bx - ax| <= NEIGHBOR_RADIUS can hold a close B.
+    order = np.argsort(cx[~is_a])
+    bxs, bys = cx[~is_a][order], cy[~is_a][order]
     needs_tower_b = False
     for ax, ay in tower_a_centers:
-        has_close_b = any(math.hypot(ax - bx, ay - by) <= NEIGHBOR_RADIUS for bx, by in tower_b_centers)
-        if not has_close_b:
+        lo = np.searchsorted(bxs, ax - NEIGHBOR_RADIUS, side="left")
+        hi = np.searchsorted(bxs, ax + NEIGHBOR_RADIUS, side="right")
+        dist_sq = (bxs[lo:hi] - ax) ** 2 + (bys[lo:hi] - ay) ** 2
+        if not np.any(dist_sq <= NEIGHBOR_RADIUS_SQ):
             needs_tower_b = True
             break
     
@@ -93,6 +157,8 @@ def try_add_building(layout: List[Rect], attempts: int = 50) -> Optional[List[Re
     if needs_tower_b and count_b < count_a:
         building_type = "B"
         dims = BUILDING_TYPES[building_type]
+        x_max = SITE_WIDTH - SETBACK - dims["w"]
+        y_max = SITE_HEIGHT - SETBACK - dims["h"]
         
         # Place Tower B near uncovered Tower A
         for _ in range(attempts):
@@ -103,8 +169,8 @@ def try_add_building(layout: List[Rect], attempts: int = 50) -> Optional[List[Re
             x = ax + distance * math.cos(angle) - dims["w"] / 2
             y = ay + distance * math.sin(angle) - dims["h"] / 2
             
-            x = max(SETBACK, min(x, SITE_WIDTH - SETBACK - dims["w"]))
-            y = max(SETBACK, min(y, SITE_HEIGHT - SETBACK - dims["h"]))
+            x = max(SETBACK, min(x, x_max))
+            y = max(SETBACK, min(y, y_max))
             
             rect = {"x": x, "y": y, "w": dims["w"], "h": dims["h"], "type": building_type}
             
@@ -116,33 +182,40 @@ def try_add_building(layout: List[Rect], attempts: int = 50) -> Optional[List[Re
     if count_a <= count_b + 4:  # Allow up to 4 more A than B
         building_type = "A"
         dims = BUILDING_TYPES[building_type]
+        x_max = SITE_WIDTH - SETBACK - dims["w"]
+        y_max = SITE_HEIGHT - SETBACK - dims["h"]
         
-        # Define boundary zones (near edges but respecting setback)
+        # Define boundary zones (near edges but respecting setback).
+        # None marks the coordinate drawn along the edge on each attempt.
         boundary_zones = [
             # Left edge
-            (SETBACK, random.uniform(SETBACK, SITE_HEIGHT - SETBACK - dims["h"])),
+            (SETBACK, None),
             # Right edge
-            (SITE_WIDTH - SETBACK - dims["w"], random.uniform(SETBACK, SITE_HEIGHT - SETBACK - dims["h"])),
+            (x_max, None),
             # Top edge
-            (random.uniform(SETBACK, SITE_WIDTH - SETBACK - dims["w"]), SETBACK),
+            (None, SETBACK),
             # Bottom edge
-            (random.uniform(SETBACK, SITE_WIDTH - SETBACK - dims["w"]), SITE_HEIGHT - SETBACK - dims["h"]),
+            (None, y_max),
             # Near corners
             (SETBACK + 5, SETBACK + 5),
-            (SITE_WIDTH - SETBACK - dims["w"] - 5, SETBACK + 5),
-            (SETBACK + 5, SITE_HEIGHT - SETBACK - dims["h"] - 5),
-            (SITE_WIDTH - SETBACK - dims["w"] - 5, SITE_HEIGHT - SETBACK - dims["h"] - 5),
+            (x_max - 5, SETBACK + 5),
+            (SETBACK + 5, y_max - 5),
+            (x_max - 5, y_max - 5),
         ]
         
         # Try boundary positions first
         for _ in range(attempts // 2):
             x, y = random.choice(boundary_zones)
+            if x is None:
+                x = random.uniform(SETBACK, x_max)
+            if y is None:
+                y = random.uniform(SETBACK, y_max)
             # Add small random offset
             x += random.uniform(-10, 10)
             y += random.uniform(-10, 10)
             
-            x = max(SETBACK, min(x, SITE_WIDTH - SETBACK - dims["w"]))
-            y = max(SETBACK, min(y, SITE_HEIGHT - SETBACK - dims["h"]))
+            x = max(SETBACK, min(x, x_max))
+            y = max(SETBACK, min(y, y_max))
             
             rect = {"x": x, "y": y, "w": dims["w"], "h": dims["h"], "type": building_type}
             
@@ -153,10 +226,12 @@ def try_add_building(layout: List[Rect], attempts: int = 50) -> Optional[List[Re
     # Fallback: try random placement
     building_type = random.choice(["A", "B"])
     dims = BUILDING_TYPES[building_type]
+    x_max = SITE_WIDTH - SETBACK - dims["w"]
+    y_max = SITE_HEIGHT - SETBACK - dims["h"]
     
     for _ in range(attempts):
-        x = random.uniform(SETBACK, SITE_WIDTH - SETBACK - dims["w"])
-        y = random.uniform(SETBACK, SITE_HEIGHT - SETBACK - dims["h"])
+        x = random.uniform(SETBACK, x_max)
+        y = random.uniform(SETBACK, y_max)
         rect = {"x": x, "y": y, "w": dims["w"], "h": dims["h"], "type": building_type}
         
         if inside_site(rect) and not intersects_plaza(rect) and spacing_ok(rect, new_layout, MIN_SPACING):
@@ -166,67 +241,194 @@ def try_add_building(layout: List[Rect], attempts: int = 50) -> Optional[List[Re
     return None
 
 
+def _score_population(
+    population: List[List[Rect]], score_cache: Dict[bytes, float], pool=None, workers: int = 1
+) -> List[float]:
+    """Score a population, evaluating only layouts missing from ``score_cache``.
+    
+    Misses are batched through ``pool`` when one is given and there are at
+    least two per worker; smaller batches are cheaper to score serially.
+    """
+    keys = [_layout_key(layout) for layout in population]
+    missing: Dict[bytes, List[Rect]] = {}
+    for key, layout in zip(keys, population):
+        if key not in score_cache and key not in missing:
+            missing[key] = layout
+    if missing:
+        batch = list(missing.values())
+        if pool is not None and len(batch) >= 2 * workers:
+            chunksize = max(1, len(batch) // workers)
+            scores = pool.map(score_layout, batch, chunksize=chunksize)
+        else:
+            scores = [_score_cached(_rect_key(layout)) for layout in batch]
+        score_cache.update(zip(missing, scores))
+    return [score_cache[key] for key in keys]
+
+
+def _scoring_workers(population_size: int, score_workers: int) -> int:
+    """Number of scoring processes worth starting; 1 means score serially."""
+    if score_workers <= 1 or population_size < 2 * score_workers:
+        return 1
+    return score_workers
+
+
 def evolve_layout(
     initial_layout: List[Rect],
     generations: int = 100,
     population_size: int = 20,
     mutation_rate: float = 0.3,
+    score_workers: int = 1,
 ) -> List[Rect]:
-    """Evolve a layout using evolutionary algorithm."""
-    population = [copy.deepcopy(initial_layout) for _ in range(population_size)]
+    """Evolve a layout using evolutionary algorithm.
+    
+    Scoring is serial by default: incremental scoring leaves only a layout or
+    two per generation to score in full, too few to pay for a process pool.
+    With ``score_workers`` > 1, generations with at least two such layouts per
+    worker are scored in a pool of that many processes.
+    """
+    return _evolve_scored(initial_layout, generations, population_size, mutation_rate, score_workers)[1]
+
+
+def _evolve_scored(
+    initial_layout: List[Rect],
+    generations: int = 100,
+    population_size: int = 20,
+    mutation_rate: float = 0.3,
+    score_workers: int = 1,
+) -> Tuple[float, List[Rect]]:
+    """``evolve_layout`` that also returns the best layout's score."""
+    # Survivors are carried over unchanged, so memoize scores by layout content.
+    # The cache lives for this call only, which keeps its size bounded.
+    score_cache: Dict[bytes, float] = {}
+    
+    workers = _scoring_workers(population_size, score_workers)
+    pool = None
+    if workers > 1:
+        methods = multiprocessing.get_all_start_methods()
+        pool = multiprocessing.get_context("fork" if "fork" in methods else None).Pool(workers)
+    try:
+        return _evolve(initial_layout, generations, population_size, mutation_rate, score_cache, pool, workers)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+
+def _evolve(
+    initial_layout: List[Rect],
+    generations: int,
+    population_size: int,
+    mutation_rate: float,
+    score_cache: Dict[bytes, float],
+    pool,
+    workers: int,
+) -> Tuple[float, List[Rect]]:
+    population = [[r.copy() for r in initial_layout] for _ in range(population_size)]
     best_layout = initial_layout
-    best_score = score_layout(initial_layout)
+    best_score = _score_population([initial_layout], score_cache)[0]
     
     for gen in range(generations):
         # Score all individuals
-        scored = [(score_layout(layout), layout) for layout in population]
+        scores = _score_population(population, score_cache, pool, workers)
+        scored = list(zip(scores, population))
         scored.sort(key=lambda x: x[0], reverse=True)
         
         # Update best
         if scored[0][0] > best_score:
             best_score = scored[0][0]
-            best_layout = copy.deepcopy(scored[0][1])
+            best_layout = [r.copy() for r in scored[0][1]]
         
         # Keep top 50%
-        survivors = [layout for _, layout in scored[:population_size // 2]]
+        survivors = scored[:population_size // 2]
         
-        # Generate new population
-        new_population = copy.deepcopy(survivors)
+        # Generate new population. Survivors are shared, not copied: nothing mutates a
+        # layout in place (mutate_layout and try_add_building build fresh rect dicts).
+        new_population = [layout for _, layout in survivors]
         
         while len(new_population) < population_size:
-            parent = random.choice(survivors)
-            child = mutate_layout(parent, mutation_rate)
+            parent_score, parent = random.choice(survivors)
+            child, affected = mutate_layout(parent, mutation_rate)
             
             # Occasionally try to add a building
             if random.random() < 0.3:
                 improved = try_add_building(child)
                 if improved is not None:
                     child = improved
+                    if affected is not None:
+                        affected.append(len(child) - 1)
             
+            # Score children from their parent's score so only the changed rects are rechecked;
+            # the rest are left for the next batched _score_population call
+            if affected is not None and parent_score > INVALID_SCORE:
+                key = _layout_key(child)
+                if key not in score_cache:
+                    score_cache[key] = score_layout_incremental(child, parent_score, affected)
             new_population.append(child)
         
         population = new_population
     
-    return best_layout
+    return best_score, best_layout
+
+
+def _evolve_seeded(
+    initial: List[Rect], seed: int, generations: int, evolve_kwargs: Dict
+) -> Tuple[float, List[Rect]]:
+    """Worker entry point: reseed both RNGs so forked workers don't share a stream."""
+    random.seed(seed)
+    seed_rng(seed)
+    return _evolve_scored(initial, generations, **evolve_kwargs)
 
 
 def evolutionary_search(
     count: int,
     initial_pool: List[List[Rect]],
     generations: int = 100,
+    max_workers: Optional[int] = None,
+    top_k: Optional[int] = None,
     **evolve_kwargs,
-) -> List[List[Rect]]:
-    """Evolve multiple initial layouts to produce diverse high-quality results."""
+) -> List[Tuple[float, List[Rect]]]:
+    """Evolve multiple initial layouts to produce diverse high-quality results.
+    
+    Returns the best ``top_k`` (default ``count``) ``(score, layout)`` pairs,
+    best first. Scores are the ones evolution already computed, so callers
+    don't need to rescore.
+    
+    Each initial layout is evolved in its own worker process. Per-task seeds are
+    drawn from the caller's RNG, so seeded runs stay reproducible. A single
+    layout is evolved in-process.
+    """
     evolved = []
     
-    for initial in initial_pool[:count]:
-        improved = evolve_layout(initial, generations, **evolve_kwargs)
-        validation = layout_valid(improved, NEIGHBOR_RADIUS)
-        if validation["all"]:
-            evolved.append(improved)
+    initials = initial_pool[:count]
+    seeds = [random.randrange(2**32) for _ in initials]
+    if len(initials) == 1:
+        # _evolve_seeded reseeds both RNGs; restore them so the caller's streams are untouched
+        py_state, np_state = random.getstate(), rng.bit_generator.state
+        try:
+            results = [_evolve_seeded(initials[0], seeds[0], generations, evolve_kwargs)]
+        finally:
+            random.setstate(py_state)
+            rng.bit_generator.state = np_state
+    else:
+        # Outer parallelism wins here; keep each worker's scoring serial
+        worker_kwargs = {"score_workers": 1, **evolve_kwargs}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(
+                executor.map(
+                    _evolve_seeded,
+                    initials,
+                    seeds,
+                    [generations] * len(initials),
+                    [worker_kwargs] * len(initials),
+                    chunksize=1,
+                )
+            )
+    
+    for score, improved in results:
+        if layout_valid_fast(improved, NEIGHBOR_RADIUS):
+            evolved.append((score, improved))
     
     # Sort by score and return best
-    evolved_scored = [(score_layout(layout), layout) for layout in evolved]
-    evolved_scored.sort(key=lambda x: x[0], reverse=True)
+    evolved.sort(key=lambda x: x[0], reverse=True)
     
-    return [layout for _, layout in evolved_scored[:count]]
+    return evolved[:count if top_k is None else top_k]
@@ -1,6 +1,9 @@
 """Export layouts to various formats."""
+import hashlib
 import json
-from typing import Any, Dict, List
+import os
+import shutil
+from typing import Dict, List
 
 from config import (
     BUILDING_TYPES,
@@ -11,11 +14,12 @@ from config import (
     SITE_HEIGHT,
     SITE_WIDTH,
 )
+from generator import LayoutStats
 
 Rect = Dict[str, float]
 
 
-def export_to_json(layout: List[Rect], stats: Dict[str, Any], filepath: str) -> None:
+def export_to_json(layout: List[Rect], stats: LayoutStats, filepath: str) -> None:
     """Export a layout to JSON format."""
     data = {
         "site": {
@@ -44,16 +48,16 @@ def export_to_json(layout: List[Rect], stats: Dict[str, Any], filepath: str) ->
         ],
         "statistics": {
             "total_buildings": len(layout),
-            "tower_a_count": stats.get("count_A", 0),
-            "tower_b_count": stats.get("count_B", 0),
-            "total_built_area": stats.get("area", 0),
-            "valid": stats.get("valid", False),
+            "tower_a_count": stats.count_A,
+            "tower_b_count": stats.count_B,
+            "total_built_area": stats.area,
+            "valid": stats.valid,
         },
         "rule_validation": {
-            "boundary": stats.get("rule_boundary", False),
-            "plaza": stats.get("rule_plaza", False),
-            "spacing": stats.get("rule_spacing", False),
-            "neighbor_mix": stats.get("rule_neighbor", False),
+            "boundary": stats.rule_boundary,
+            "plaza": stats.rule_plaza,
+            "spacing": stats.rule_spacing,
+            "neighbor_mix": stats.rule_neighbor,
         },
     }
     
@@ -61,7 +65,7 @@ def export_to_json(layout: List[Rect], stats: Dict[str, Any], filepath: str) ->
         json.dump(data, f, indent=2)
 
 
-def export_to_csv(layouts: List[tuple[List[Rect], Dict[str, Any]]], filepath: str) -> None:
+def export_to_csv(layouts: List[tuple[List[Rect], LayoutStats]], filepath: str) -> None:
     """Export multiple layouts to CSV summary format."""
     import csv
     
@@ -84,12 +88,40 @@ def export_to_csv(layouts: List[tuple[List[Rect], Dict[str, Any]]], filepath: st
             writer.writerow([
                 idx,
                 len(layout),
-                stats.get("count_A", 0),
-                stats.get("count_B", 0),
-                stats.get("area", 0),
-                stats.get("valid", False),
-                stats.get("rule_boundary", False),
-                stats.get("rule_plaza", False),
-                stats.get("rule_spacing", False),
-                stats.get("rule_neighbor", False),
+                stats.count_A,
+                stats.count_B,
+                stats.area,
+                stats.valid,
+                stats.rule_boundary,
+                stats.rule_plaza,
+                stats.rule_spacing,
+                stats.rule_neighbor,
             ])
+
+
+def layout_digest(layout: List[Rect]) -> bytes:
+    """Content hash of a layout, independent of rect order."""
+    rects = sorted((r["x"], r["y"], r["w"], r["h"], r["type"]) for r in layout)
+    return hashlib.blake2b(repr(rects).encode(), digest_size=16).digest()
+
+
+def write_bytes(path: str, data: bytes) -> None:
+    """Write ``data`` to a new file at ``path``.
+    
+    An existing file is unlinked first rather than truncated, so a PNG that
+    ``link_or_copy`` hard-linked from another output is never written through.
+    """
+    if os.path.lexists(path):
+        os.remove(path)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Make ``dst`` a hard link to ``src``, copying when the filesystem can't link."""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
@@ -1,38 +1,143 @@
 import random
+from dataclasses import dataclass
 from typing import Dict, List, Optional
 
-from config import BUILDING_TYPES, MIN_SPACING, NEIGHBOR_RADIUS, SETBACK, SITE_HEIGHT, SITE_WIDTH
+import numpy as np
+
+from config import BUILDING_TYPES, MIN_SPACING, NEIGHBOR_RADIUS
 from geometry import (
-    edge_distance,
+    PLAZA_BOUNDS,
+    SITE_BOUNDS,
+    SPACING_QUERY_RADIUS,
+    SpatialHash,
     inside_site,
     intersects_plaza,
     layout_valid,
-    neighbor_mix_ok,
+    rect_center,
     spacing_ok,
 )
 
 Rect = Dict[str, float]
 
+# Shared NumPy generator for bulk draws; reseeded in place so importers keep the same object.
+rng = np.random.default_rng()
+
+
+def seed_rng(seed: int) -> None:
+    rng.bit_generator.state = np.random.PCG64(seed).state
+
+
+# Resolution of the candidate grid used by the feasible-region sampler.
+GRID_STEP = MIN_SPACING / 2
+
+
+class _PlacementGrid:
+    """Per-type grids of candidate top-left corners with the infeasible ones masked out.
+
+    A cell is blocked when a building of that type anchored at the cell would
+    cross the plaza or sit closer than ``MIN_SPACING`` to a placed building.
+    The setback is enforced by the grid extent itself.
+    """
+
+    def __init__(self) -> None:
+        x_lo, y_lo, x_hi, y_hi = SITE_BOUNDS
+        px, py, px_hi, py_hi = PLAZA_BOUNDS
+        self.grids: Dict[str, tuple] = {}
+        for type_name, dims in BUILDING_TYPES.items():
+            w, h = dims["w"], dims["h"]
+            xs = np.arange(x_lo, x_hi - w + 1e-9, GRID_STEP)
+            ys = np.arange(y_lo, y_hi - h + 1e-9, GRID_STEP)
+            gx, gy = np.meshgrid(xs, ys)
+            blocked = ~((gx + w <= px) | (px_hi <= gx) | (gy + h <= py) | (py_hi <= gy))
+            self.grids[type_name] = (gx, gy, blocked)
+
+    def block_around(self, rect: Rect) -> None:
+        """Block every cell whose building would violate spacing with ``rect``."""
+        for type_name, (gx, gy, blocked) in self.grids.items():
+            dims = BUILDING_TYPES[type_name]
+            dx = np.maximum(0.0, np.maximum(rect["x"] - (gx + dims["w"]), gx - (rect["x"] + rect["w"])))
+            dy = np.maximum(0.0, np.maximum(rect["y"] - (gy + dims["h"]), gy - (rect["y"] + rect["h"])))
+            blocked |= dx * dx + dy * dy < MIN_SPACING * MIN_SPACING
+
+    def sample(self, type_name: str, u: float) -> Optional[tuple[float, float]]:
+        """Map a uniform draw ``u`` in [0, 1) to a free cell corner, or None when none is left."""
+        gx, gy, blocked = self.grids[type_name]
+        free = np.argwhere(~blocked)
+        if len(free) == 0:
+            return None
+        row, col = free[int(u * len(free))]
+        return float(gx[row, col]), float(gy[row, col])
+
+    def block_cell(self, type_name: str, x: float, y: float) -> None:
+        gx, gy, blocked = self.grids[type_name]
+        blocked[(gx == x) & (gy == y)] = True
+
+    def unblock_cell(self, type_name: str, x: float, y: float) -> None:
+        gx, gy, blocked = self.grids[type_name]
+        blocked[(gx == x) & (gy == y)] = False
 
-def _random_position(w: float, h: float) -> tuple[float, float]:
-    x = random.uniform(SETBACK, SITE_WIDTH - SETBACK - w)
-    y = random.uniform(SETBACK, SITE_HEIGHT - SETBACK - h)
-    return x, y
 
+def _placement_ok(rect: Rect, current: List[Rect], index: SpatialHash) -> bool:
+    if not inside_site(rect) or intersects_plaza(rect):
+        return False
+    cx, cy = rect_center(rect)
+    nearby = (current[i] for i in index.query(cx, cy, SPACING_QUERY_RADIUS))
+    return spacing_ok(rect, nearby, MIN_SPACING)
 
-def _try_place(type_name: str, current: List[Rect], attempts: int) -> Optional[Rect]:
+
+def _try_place(
+    type_name: str, grid: _PlacementGrid, current: List[Rect], index: SpatialHash, attempts: int
+) -> Optional[Rect]:
+    """Sample a position from the feasible region of ``grid``.
+
+    A jittered point inside a free cell keeps positions continuous. When it
+    fails, the cell is blocked and up to ``attempts`` cells are tried in all;
+    the corner of the first one, which the grid mask guarantees is feasible,
+    is the fallback. Cells blocked here are freed again before returning,
+    since their corners are still valid for later buildings.
+    """
     dims = BUILDING_TYPES[type_name]
-    for _ in range(attempts):
-        x, y = _random_position(dims["w"], dims["h"])
-        rect = {"x": x, "y": y, "w": dims["w"], "h": dims["h"], "type": type_name}
-        if not inside_site(rect):
-            continue
-        if intersects_plaza(rect):
-            continue
-        if not spacing_ok(rect, current, MIN_SPACING):
+    x_max = SITE_BOUNDS[2] - dims["w"]
+    y_max = SITE_BOUNDS[3] - dims["h"]
+    tried = []
+    try:
+        for _ in range(attempts):
+            u, jx, jy = rng.random(3).tolist()
+            cell = grid.sample(type_name, u)
+            if cell is None:
+                break
+            x, y = cell
+            cx, cy = min(x + jx * GRID_STEP, x_max), min(y + jy * GRID_STEP, y_max)
+            rect = {"x": cx, "y": cy, "w": dims["w"], "h": dims["h"], "type": type_name}
+            if _placement_ok(rect, current, index):
+                return rect
+            grid.block_cell(type_name, x, y)
+            tried.append((x, y))
+    finally:
+        for x, y in tried:
+            grid.unblock_cell(type_name, x, y)
+    if not tried:
+        return None
+    x, y = tried[0]
+    return {"x": x, "y": y, "w": dims["w"], "h": dims["h"], "type": type_name}
+
+
+def _place(rect: Rect, current: List[Rect], grid: _PlacementGrid, index: SpatialHash) -> None:
+    index.insert(len(current), *rect_center(rect))
+    current.append(rect)
+    grid.block_around(rect)
+
+
+def _neighbor_mix_ok_indexed(current: List[Rect], index: SpatialHash) -> bool:
+    if not any(r["type"] == "B" for r in current):
+        return False
+    for idx, rect in enumerate(current):
+        if rect["type"] != "A":
             continue
-        return rect
-    return None
+        cx, cy = index.points[idx]
+        if not any(current[j]["type"] == "B" for j in index.query(cx, cy, NEIGHBOR_RADIUS)):
+            return False
+    return True
 
 
 def generate_layout(
@@ -44,27 +149,31 @@ def generate_layout(
 ) -> Optional[List[Rect]]:
     if seed is not None:
         random.seed(seed)
+        seed_rng(seed)
     target = random.randint(min_buildings, max_buildings)
     current: List[Rect] = []
 
+    grid = _PlacementGrid()
+    index = SpatialHash(SPACING_QUERY_RADIUS)
+
     type_choices = ["A", "B"]
     for _ in range(target):
         t = random.choice(type_choices)
-        rect = _try_place(t, current, attempts_per_building)
+        rect = _try_place(t, grid, current, index, attempts_per_building)
         if rect is None:
             return None
-        current.append(rect)
+        _place(rect, current, grid, index)
 
     added = 0
     while added < fill_extra:
         t = random.choice(type_choices)
-        rect = _try_place(t, current, attempts_per_building)
+        rect = _try_place(t, grid, current, index, attempts_per_building)
         if rect is None:
             break
-        current.append(rect)
+        _place(rect, current, grid, index)
         added += 1
 
-    if not neighbor_mix_ok(current, NEIGHBOR_RADIUS):
+    if not _neighbor_mix_ok_indexed(current, index):
         return None
     return current
 
@@ -86,19 +195,33 @@ def collect_valid_layouts(
     return layouts
 
 
-def summarize(layout: List[Rect]) -> Dict[str, float]:
+@dataclass(slots=True)
+class LayoutStats:
+    """Building counts, built area and per-rule validity of one layout."""
+
+    count_A: int
+    count_B: int
+    area: float
+    valid: bool
+    rule_boundary: bool
+    rule_plaza: bool
+    rule_spacing: bool
+    rule_neighbor: bool
+
+
+def summarize(layout: List[Rect]) -> LayoutStats:
     counts = {"A": 0, "B": 0}
     for r in layout:
         counts[r["type"]] += 1
     area = sum(r["w"] * r["h"] for r in layout)
     rules = layout_valid(layout, NEIGHBOR_RADIUS)
-    return {
-        "count_A": counts["A"],
-        "count_B": counts["B"],
-        "area": area,
-        "rule_boundary": rules["boundary"],
-        "rule_plaza": rules["plaza"],
-        "rule_spacing": rules["spacing"],
-        "rule_neighbor": rules["neighbor_mix"],
-        "valid": rules["all"],
-    }
+    return LayoutStats(
+        count_A=counts["A"],
+        count_B=counts["B"],
+        area=area,
+        valid=rules["all"],
+        rule_boundary=rules["boundary"],
+        rule_plaza=rules["plaza"],
+        rule_spacing=rules["spacing"],
+        rule_neighbor=rules["neighbor_mix"],
+    )
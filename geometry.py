@@ -1,74 +1,246 @@
 import math
+from collections import defaultdict
+from dataclasses import dataclass
 from typing import Dict, Iterable, List, Tuple
 
-from config import MIN_SPACING, PLAZA, SETBACK, SITE_HEIGHT, SITE_WIDTH
+import numpy as np
+
+from config import BUILDING_TYPES, MIN_SPACING, PLAZA, SETBACK, SITE_HEIGHT, SITE_WIDTH
+from geometry_numba import (
+    NUMBA_AVAILABLE,
+    PARALLEL_THRESHOLD,
+    layout_reductions_nb,
+    neighbor_mix_ok_nb,
+    neighbor_mix_ok_nb_parallel,
+    pairwise_spacing_ok_nb,
+)
 
 Rect = Dict[str, float]
 ViolationReport = Dict[str, object]
 
+TYPE_NAMES = tuple(BUILDING_TYPES)
+TYPE_CODES = {name: code for code, name in enumerate(TYPE_NAMES)}
+
+
+@dataclass
+class Layout:
+    """Structure-of-arrays layout: one ``[x, y, w, h]`` row and one int8 type code per rect."""
+
+    xywh: np.ndarray
+    types: np.ndarray
+
+    @classmethod
+    def from_dicts(cls, layout: List[Rect]) -> "Layout":
+        xywh = np.array([(r["x"], r["y"], r["w"], r["h"]) for r in layout], dtype=np.float64).reshape(-1, 4)
+        types = np.array([TYPE_CODES[r["type"]] for r in layout], dtype=np.int8)
+        return cls(xywh, types)
+
+    def to_dicts(self) -> List[Rect]:
+        return [
+            {"x": x, "y": y, "w": w, "h": h, "type": TYPE_NAMES[t]}
+            for (x, y, w, h), t in zip(self.xywh.tolist(), self.types.tolist())
+        ]
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def centers(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.xywh[:, 0] + 0.5 * self.xywh[:, 2], self.xywh[:, 1] + 0.5 * self.xywh[:, 3]
+
+    def xyxy(self) -> np.ndarray:
+        return np.hstack([self.xywh[:, :2], self.xywh[:, :2] + self.xywh[:, 2:]])
+
 
 def rect_center(rect: Rect) -> tuple[float, float]:
     return rect["x"] + rect["w"] * 0.5, rect["y"] + rect["h"] * 0.5
 
 
-def inside_site(rect: Rect) -> bool:
-    return (
-        rect["x"] >= SETBACK
-        and rect["y"] >= SETBACK
-        and rect["x"] + rect["w"] <= SITE_WIDTH - SETBACK
-        and rect["y"] + rect["h"] <= SITE_HEIGHT - SETBACK
-    )
+# Buildable area inside the setback and the plaza footprint, as (x_lo, y_lo, x_hi, y_hi).
+# Every rule check against the site or plaza (the predicates below, affected_rules_ok
+# and the generator's placement grid) reads these instead of re-deriving them from config.
+SITE_BOUNDS = (SETBACK, SETBACK, SITE_WIDTH - SETBACK, SITE_HEIGHT - SETBACK)
+PLAZA_BOUNDS = (PLAZA["x"], PLAZA["y"], PLAZA["x"] + PLAZA["w"], PLAZA["y"] + PLAZA["h"])
 
 
-def intersects_plaza(rect: Rect) -> bool:
-    px, py, pw, ph = PLAZA["x"], PLAZA["y"], PLAZA["w"], PLAZA["h"]
-    return not (
-        rect["x"] + rect["w"] <= px
-        or px + pw <= rect["x"]
-        or rect["y"] + rect["h"] <= py
-        or py + ph <= rect["y"]
-    )
+# The site and plaza never change at runtime, so these hot predicates are built
+# once with their bounds baked into default arguments (local-variable lookups).
+def _make_inside_site(bounds: Tuple[float, float, float, float]):
+    x_lo, y_lo, x_hi, y_hi = bounds
+
+    def inside_site(rect: Rect, _x_lo=x_lo, _y_lo=y_lo, _x_hi=x_hi, _y_hi=y_hi) -> bool:
+        x, y = rect["x"], rect["y"]
+        return x >= _x_lo and y >= _y_lo and x + rect["w"] <= _x_hi and y + rect["h"] <= _y_hi
+
+    return inside_site
+
+
+def _make_intersects_plaza(bounds: Tuple[float, float, float, float]):
+    px, py, px_hi, py_hi = bounds
+
+    def intersects_plaza(rect: Rect, _px=px, _py=py, _px_hi=px_hi, _py_hi=py_hi) -> bool:
+        x, y = rect["x"], rect["y"]
+        return not (x + rect["w"] <= _px or _px_hi <= x or y + rect["h"] <= _py or _py_hi <= y)
+
+    return intersects_plaza
+
+
+inside_site = _make_inside_site(SITE_BOUNDS)
+intersects_plaza = _make_intersects_plaza(PLAZA_BOUNDS)
 
 
 def edge_distance(r1: Rect, r2: Rect) -> float:
-    dx = max(0.0, r2["x"] - (r1["x"] + r1["w"]), r1["x"] - (r2["x"] + r2["w"]))
-    dy = max(0.0, r2["y"] - (r1["y"] + r1["h"]), r1["y"] - (r2["y"] + r2["h"]))
+    r1x, r1y = r1["x"], r1["y"]
+    r2x, r2y = r2["x"], r2["y"]
+    dx = max(0.0, r2x - (r1x + r1["w"]), r1x - (r2x + r2["w"]))
+    dy = max(0.0, r2y - (r1y + r1["h"]), r1y - (r2y + r2["h"]))
+    # Rects overlapping on one axis are separated along the other only
+    if dy == 0.0:
+        return dx
+    if dx == 0.0:
+        return dy
     return math.hypot(dx, dy)
 
 
 def spacing_ok(rect: Rect, others: Iterable[Rect], min_spacing: float = MIN_SPACING) -> bool:
-    return all(edge_distance(rect, other) >= min_spacing for other in others)
+    x1, y1 = rect["x"], rect["y"]
+    x1r, y1t = x1 + rect["w"], y1 + rect["h"]
+    min_sq = min_spacing * min_spacing
+    for other in others:
+        x2, y2 = other["x"], other["y"]
+        dx = max(0.0, x2 - x1r, x1 - (x2 + other["w"]))
+        dy = max(0.0, y2 - y1t, y1 - (y2 + other["h"]))
+        if dx * dx + dy * dy < min_sq:
+            return False
+    return True
+
+
+class SpatialHash:
+    """Uniform grid over points for "which points lie within r" queries."""
+
+    def __init__(self, cell_size: float) -> None:
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.points: Dict[int, Tuple[float, float]] = {}
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, idx: int, x: float, y: float) -> None:
+        self.points[idx] = (x, y)
+        self.cells[self._cell(x, y)].append(idx)
+
+    def query(self, x: float, y: float, radius: float) -> List[int]:
+        ci, cj = self._cell(x, y)
+        span = int(math.ceil(radius / self.cell_size))
+        r2 = radius * radius
+        found = []
+        for i in range(ci - span, ci + span + 1):
+            for j in range(cj - span, cj + span + 1):
+                for idx in self.cells.get((i, j), ()):
+                    px, py = self.points[idx]
+                    if (px - x) ** 2 + (py - y) ** 2 <= r2:
+                        found.append(idx)
+        return found
+
+
+# Any rect closer than MIN_SPACING (edge to edge) has its center within this
+# distance, so a center query with it yields every possible spacing conflict.
+SPACING_QUERY_RADIUS = MIN_SPACING + max(math.hypot(d["w"], d["h"]) for d in BUILDING_TYPES.values())
+
+
+def _pairwise_edge_distances(xyxy: np.ndarray) -> np.ndarray:
+    """Edge-to-edge distance matrix for all rect pairs (same formula as ``edge_distance``)."""
+    zero = np.zeros((len(xyxy), len(xyxy)))
+    dx = np.maximum.reduce([zero, xyxy[None, :, 0] - xyxy[:, None, 2], xyxy[:, None, 0] - xyxy[None, :, 2]])
+    dy = np.maximum.reduce([zero, xyxy[None, :, 1] - xyxy[:, None, 3], xyxy[:, None, 1] - xyxy[None, :, 3]])
+    return np.hypot(dx, dy)
+
+
+def _spacing_ok_soa(soa: Layout, min_spacing: float = MIN_SPACING) -> bool:
+    if NUMBA_AVAILABLE:
+        return bool(pairwise_spacing_ok_nb(soa.xywh, min_spacing))
+    dists = _pairwise_edge_distances(soa.xyxy())
+    np.fill_diagonal(dists, np.inf)
+    return not bool(np.any(dists < min_spacing))
+
+
+def _neighbor_mix_ok_soa(soa: Layout, neighbor_radius: float) -> bool:
+    if NUMBA_AVAILABLE:
+        cx, cy = soa.centers()
+        scan = neighbor_mix_ok_nb_parallel if len(soa) > PARALLEL_THRESHOLD else neighbor_mix_ok_nb
+        return bool(scan(cx, cy, soa.types, neighbor_radius))
+    is_a = soa.types == TYPE_CODES["A"]
+    is_b = soa.types == TYPE_CODES["B"]
+    if not is_b.any():
+        return False
+    cx, cy = soa.centers()
+    dist_sq = (cx[is_a, None] - cx[None, is_b]) ** 2 + (cy[is_a, None] - cy[None, is_b]) ** 2
+    return bool((dist_sq <= neighbor_radius * neighbor_radius).any(axis=1).all())
+
+
+def layout_reductions(soa: Layout) -> Tuple[float, float, float, int]:
+    """Return ``(total_area, x_spread, y_spread, count_a)`` of the rect centers."""
+    if NUMBA_AVAILABLE:
+        area, x_spread, y_spread, count_a = layout_reductions_nb(soa.xywh, soa.types)
+        return float(area), float(x_spread), float(y_spread), int(count_a)
+    if not len(soa):
+        return 0.0, 0.0, 0.0, 0
+    xywh = soa.xywh
+    cx, cy = soa.centers()
+    return (
+        float((xywh[:, 2] * xywh[:, 3]).sum()),
+        float(cx.max() - cx.min()),
+        float(cy.max() - cy.min()),
+        int(np.count_nonzero(soa.types == TYPE_CODES["A"])),
+    )
 
 
 def neighbor_mix_ok(layout: List[Rect], neighbor_radius: float) -> bool:
-    centers = {id(r): rect_center(r) for r in layout}
-    bs = [r for r in layout if r["type"] == "B"]
-    if not bs:
+    return _neighbor_mix_ok_soa(Layout.from_dicts(layout), neighbor_radius)
+
+
+def affected_rules_ok(soa: Layout, affected: List[int], neighbor_radius: float) -> bool:
+    """Recheck only the rules involving ``affected`` rects; the rest must already be valid."""
+    xyxy = soa.xyxy()
+    sub = xyxy[affected]
+    x_lo, y_lo, x_hi, y_hi = SITE_BOUNDS
+    inside = (sub[:, 0] >= x_lo) & (sub[:, 1] >= y_lo) & (sub[:, 2] <= x_hi) & (sub[:, 3] <= y_hi)
+    if not inside.all():
+        return False
+    px, py, px_hi, py_hi = PLAZA_BOUNDS
+    clear = (sub[:, 2] <= px) | (px_hi <= sub[:, 0]) | (sub[:, 3] <= py) | (py_hi <= sub[:, 1])
+    if not clear.all():
+        return False
+
+    dx = np.maximum(0.0, np.maximum(xyxy[None, :, 0] - sub[:, None, 2], sub[:, None, 0] - xyxy[None, :, 2]))
+    dy = np.maximum(0.0, np.maximum(xyxy[None, :, 1] - sub[:, None, 3], sub[:, None, 1] - xyxy[None, :, 3]))
+    dist_sq = dx * dx + dy * dy
+    dist_sq[np.arange(len(affected)), affected] = np.inf
+    if np.any(dist_sq < MIN_SPACING * MIN_SPACING):
         return False
-    for rect in layout:
-        if rect["type"] != "A":
-            continue
-        cx, cy = centers[id(rect)]
-        close_b = False
-        for b in bs:
-            bx, by = centers[id(b)]
-            if math.hypot(cx - bx, cy - by) <= neighbor_radius:
-                close_b = True
-                break
-        if not close_b:
-            return False
-    return True
+
+    # A moved B can uncover any A, so only A-only changes get the narrow check.
+    types = soa.types
+    if np.any(types[affected] == TYPE_CODES["B"]):
+        return _neighbor_mix_ok_soa(soa, neighbor_radius)
+    is_b = types == TYPE_CODES["B"]
+    moved_a = [i for i in affected if types[i] == TYPE_CODES["A"]]
+    if not moved_a:
+        return True
+    if not is_b.any():
+        return False
+    cx, cy = soa.centers()
+    dist_sq = (cx[moved_a, None] - cx[None, is_b]) ** 2 + (cy[moved_a, None] - cy[None, is_b]) ** 2
+    near = dist_sq <= neighbor_radius * neighbor_radius
+    return bool(near.any(axis=1).all())
 
 
 def layout_valid(layout: List[Rect], neighbor_radius: float) -> Dict[str, bool]:
     rule_boundary = all(inside_site(r) for r in layout)
     rule_plaza = all(not intersects_plaza(r) for r in layout)
-    rule_spacing = all(
-        edge_distance(r1, r2) >= MIN_SPACING
-        for i, r1 in enumerate(layout)
-        for r2 in layout[i + 1 :]
-    )
-    rule_neighbor = neighbor_mix_ok(layout, neighbor_radius)
+    soa = Layout.from_dicts(layout)
+    rule_spacing = _spacing_ok_soa(soa)
+    rule_neighbor = _neighbor_mix_ok_soa(soa, neighbor_radius)
     return {
         "boundary": rule_boundary,
         "plaza": rule_plaza,
@@ -78,27 +250,34 @@ def layout_valid(layout: List[Rect], neighbor_radius: float) -> Dict[str, bool]:
     }
 
 
+def layout_valid_fast(layout: List[Rect], neighbor_radius: float) -> bool:
+    """Boolean-only ``layout_valid(...)["all"]`` that stops at the first failing rule."""
+    for r in layout:
+        if not inside_site(r) or intersects_plaza(r):
+            return False
+    soa = Layout.from_dicts(layout)
+    return _spacing_ok_soa(soa) and _neighbor_mix_ok_soa(soa, neighbor_radius)
+
+
 def find_violations(layout: List[Rect], neighbor_radius: float) -> ViolationReport:
     boundary_fail = {idx for idx, r in enumerate(layout) if not inside_site(r)}
     plaza_fail = {idx for idx, r in enumerate(layout) if intersects_plaza(r)}
 
-    spacing_fail_pairs: List[Tuple[int, int, float]] = []
-    for i, r1 in enumerate(layout):
-        for j in range(i + 1, len(layout)):
-            r2 = layout[j]
-            dist = edge_distance(r1, r2)
-            if dist < MIN_SPACING:
-                spacing_fail_pairs.append((i, j, dist))
-
-    centers = [rect_center(r) for r in layout]
-    bs = [idx for idx, r in enumerate(layout) if r["type"] == "B"]
-    neighbor_fail = set()
-    for idx, rect in enumerate(layout):
-        if rect["type"] != "A":
-            continue
-        cx, cy = centers[idx]
-        if not any(math.hypot(cx - centers[b][0], cy - centers[b][1]) <= neighbor_radius for b in bs):
-            neighbor_fail.add(idx)
+    soa = Layout.from_dicts(layout)
+    dists = _pairwise_edge_distances(soa.xyxy())
+    iu, ju = np.triu_indices(len(layout), 1)
+    pair_dists = dists[iu, ju]
+    fail = pair_dists < MIN_SPACING
+    spacing_fail_pairs: List[Tuple[int, int, float]] = [
+        (int(i), int(j), float(d)) for i, j, d in zip(iu[fail], ju[fail], pair_dists[fail])
+    ]
+
+    cx, cy = soa.centers()
+    a_idx = np.flatnonzero(soa.types == TYPE_CODES["A"])
+    is_b = soa.types == TYPE_CODES["B"]
+    dist_sq = (cx[a_idx, None] - cx[None, is_b]) ** 2 + (cy[a_idx, None] - cy[None, is_b]) ** 2
+    covered = (dist_sq <= neighbor_radius * neighbor_radius).any(axis=1)
+    neighbor_fail = set(a_idx[~covered].tolist())
 
     affected = boundary_fail | plaza_fail | neighbor_fail | {i for pair in spacing_fail_pairs for i in pair[:2]}
 
@@ -0,0 +1,129 @@
+"""Numba-compiled kernels used by layout validation and scoring.
+
+Numba is optional: when it is not installed ``NUMBA_AVAILABLE`` is False and
+``geometry`` falls back to its NumPy implementations.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange
+
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the environment
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+
+# Layouts with more rects than this use the prange variant of the neighbor scan.
+PARALLEL_THRESHOLD = 30
+
+# Type codes as assigned by geometry.TYPE_CODES.
+TYPE_A = 0
+TYPE_B = 1
+
+
+@njit(cache=True, fastmath=True)
+def neighbor_mix_ok_nb(cx: np.ndarray, cy: np.ndarray, types: np.ndarray, radius: float) -> bool:
+    n = types.shape[0]
+    radius_sq = radius * radius
+    has_b = False
+    for j in range(n):
+        if types[j] == TYPE_B:
+            has_b = True
+            break
+    if not has_b:
+        return False
+    for i in range(n):
+        if types[i] != TYPE_A:
+            continue
+        close_b = False
+        for j in range(n):
+            if types[j] != TYPE_B:
+                continue
+            dx = cx[i] - cx[j]
+            dy = cy[i] - cy[j]
+            if dx * dx + dy * dy <= radius_sq:
+                close_b = True
+                break
+        if not close_b:
+            return False
+    return True
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def neighbor_mix_ok_nb_parallel(cx: np.ndarray, cy: np.ndarray, types: np.ndarray, radius: float) -> bool:
+    n = types.shape[0]
+    radius_sq = radius * radius
+    covered = np.ones(n, dtype=np.bool_)
+    has_b = False
+    for j in range(n):
+        if types[j] == TYPE_B:
+            has_b = True
+            break
+    if not has_b:
+        return False
+    for i in prange(n):
+        if types[i] != TYPE_A:
+            continue
+        close_b = False
+        for j in range(n):
+            if types[j] != TYPE_B:
+                continue
+            dx = cx[i] - cx[j]
+            dy = cy[i] - cy[j]
+            if dx * dx + dy * dy <= radius_sq:
+                close_b = True
+                break
+        covered[i] = close_b
+    return covered.all()
+
+
+@njit(cache=True, fastmath=True)
+def pairwise_spacing_ok_nb(xywh: np.ndarray, min_spacing: float) -> bool:
+    n = xywh.shape[0]
+    min_spacing_sq = min_spacing * min_spacing
+    for i in range(n):
+        x1 = xywh[i, 0]
+        y1 = xywh[i, 1]
+        x1r = x1 + xywh[i, 2]
+        y1t = y1 + xywh[i, 3]
+        for j in range(i + 1, n):
+            x2 = xywh[j, 0]
+            y2 = xywh[j, 1]
+            dx = max(0.0, x2 - x1r, x1 - (x2 + xywh[j, 2]))
+            dy = max(0.0, y2 - y1t, y1 - (y2 + xywh[j, 3]))
+            if dx * dx + dy * dy < min_spacing_sq:
+                return False
+    return True
+
+
+@njit(cache=True, fastmath=True)
+def layout_reductions_nb(xywh: np.ndarray, types: np.ndarray):
+    """Fused single pass returning ``(area, x_spread, y_spread, count_a)``."""
+    n = xywh.shape[0]
+    if n == 0:
+        return 0.0, 0.0, 0.0, 0
+    area = 0.0
+    count_a = 0
+    x_lo = np.inf
+    x_hi = -np.inf
+    y_lo = np.inf
+    y_hi = -np.inf
+    for i in range(n):
+        w = xywh[i, 2]
+        h = xywh[i, 3]
+        area += w * h
+        cx = xywh[i, 0] + 0.5 * w
+        cy = xywh[i, 1] + 0.5 * h
+        x_lo = min(x_lo, cx)
+        x_hi = max(x_hi, cx)
+        y_lo = min(y_lo, cy)
+        y_hi = max(y_hi, cy)
+        if types[i] == TYPE_A:
+            count_a += 1
+    return area, x_hi - x_lo, y_hi - y_lo, count_a
@@ -1,11 +1,54 @@
 import argparse
 import os
-from typing import List
+import random
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
-from generator import collect_valid_layouts, summarize
+from generator import collect_valid_layouts, seed_rng, summarize
 from viz import plot_layout
 from evolution import evolutionary_search, score_layout
-from export import export_to_json, export_to_csv
+from export import export_to_csv, export_to_json, layout_digest, link_or_copy, write_bytes
+
+
+# Seed stride between generation workers so their streams never coincide.
+SEED_OFFSET = 10007
+
+
+def _split(total: int, parts: int) -> List[int]:
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def _gen_batch(task: Tuple) -> List:
+    """Worker: collect one share of the initial layouts."""
+    worker_id, count, max_tries, gen_kwargs = task
+    seed = gen_kwargs.get("seed")
+    if seed is None:
+        # Forked workers inherit the parent's RNG state; reseed so batches differ.
+        random.seed()
+        seed_rng(random.getrandbits(64))
+    else:
+        gen_kwargs = dict(gen_kwargs, seed=seed + worker_id * SEED_OFFSET)
+    return collect_valid_layouts(count=count, max_tries=max_tries, **gen_kwargs)
+
+
+def _render_one(task: Tuple) -> Tuple[str, Optional[bytes], Optional[str]]:
+    """Worker: render the PNG bytes (and write JSON when requested) for one ranked layout.
+    
+    The PNG is skipped (None) when ``render`` is False because an identical
+    layout is already being rendered.
+    """
+    idx, stats, layout, output_dir, export_json, render = task
+    base_name = f"layout_{idx}"
+    
+    png_file = os.path.join(output_dir, f"{base_name}.png")
+    png = plot_layout(layout, stats) if render else None
+    
+    json_file = None
+    if export_json:
+        json_file = os.path.join(output_dir, f"{base_name}.json")
+        export_to_json(layout, stats, json_file)
+    return png_file, png, json_file
 
 
 def run(args: argparse.Namespace) -> None:
@@ -13,65 +56,101 @@ def run(args: argparse.Namespace) -> None:
     
     # Generate initial layouts
     print(f"Generating {args.layouts} initial layouts...")
-    initial_layouts = collect_valid_layouts(
-        count=args.layouts if not args.evolve else args.layouts * 2,
-        max_tries=args.max_tries,
+    count = args.layouts if not args.evolve else args.layouts * 2
+    gen_kwargs = dict(
         min_buildings=args.min_buildings,
         max_buildings=args.max_buildings,
         attempts_per_building=args.attempts_per_building,
         fill_extra=args.fill_extra,
         seed=args.seed,
     )
+    if args.workers > 1 and args.layouts >= 4:
+        workers = min(args.workers, count)
+        tasks = [
+            (worker_id, share, tries, gen_kwargs)
+            for worker_id, (share, tries) in enumerate(
+                zip(_split(count, workers), _split(args.max_tries, workers))
+            )
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            initial_layouts = [layout for batch in executor.map(_gen_batch, tasks) for layout in batch]
+        # A worker that runs out of tries leaves its share unfilled, and a seeded worker
+        # is all-or-nothing because generate_layout reseeds on every try; top up serially
+        if len(initial_layouts) < count:
+            initial_layouts += collect_valid_layouts(
+                count=count - len(initial_layouts), max_tries=args.max_tries, **gen_kwargs
+            )
+    else:
+        initial_layouts = collect_valid_layouts(count=count, max_tries=args.max_tries, **gen_kwargs)
 
     if not initial_layouts:
         print("No valid layouts found. Try increasing max_tries or relaxing constraints.")
         return
     
-    # Evolve if requested
+    # Evolve if requested; evolution returns its layouts already scored and ranked
+    scored_layouts = None
     if args.evolve:
         print(f"Evolving layouts for {args.generations} generations...")
-        layouts = evolutionary_search(
+        scored_layouts = evolutionary_search(
             count=args.layouts,
             initial_pool=initial_layouts,
             generations=args.generations,
             population_size=args.population_size,
             mutation_rate=args.mutation_rate,
+            top_k=args.layouts,
         )
-        if not layouts:
+        if not scored_layouts:
             print("Evolution produced no valid layouts, using initial ones.")
-            layouts = initial_layouts[:args.layouts]
-    else:
-        layouts = initial_layouts
+            scored_layouts = None
+            initial_layouts = initial_layouts[:args.layouts]
     
     # Rank layouts by score
-    scored_layouts = [(score_layout(layout), layout) for layout in layouts]
-    scored_layouts.sort(key=lambda x: x[0], reverse=True)
+    if scored_layouts is None:
+        scored_layouts = [(score_layout(layout), layout) for layout in initial_layouts]
+        scored_layouts.sort(key=lambda x: x[0], reverse=True)
+    layouts = [layout for _, layout in scored_layouts]
     
     print(f"\n{'='*70}")
     print(f"Generated {len(layouts)} layouts (ranked by quality score)")
     print(f"{'='*70}\n")
     
     # Store for CSV export
-    all_exports = []
+    all_exports = [(layout, summarize(layout)) for _, layout in scored_layouts]
     
-    for idx, (score, layout) in enumerate(scored_layouts, start=1):
-        stats = summarize(layout)
-        base_name = f"layout_{idx}"
-        
-        # Save PNG
-        png_file = os.path.join(args.output_dir, f"{base_name}.png")
-        plot_layout(layout, stats, png_file)
-        
-        # Save JSON if requested
-        if args.export_json:
-            json_file = os.path.join(args.output_dir, f"{base_name}.json")
-            export_to_json(layout, stats, json_file)
-        
-        all_exports.append((layout, stats))
-        
+    # Render PNGs (and JSON) in parallel; rasterization dominates the output phase.
+    # Layouts identical to an earlier one (common among evolved elites) are rendered once.
+    digests = [layout_digest(layout) for layout, _ in all_exports]
+    first_seen: Dict[bytes, int] = {}
+    for idx, digest in enumerate(digests, start=1):
+        first_seen.setdefault(digest, idx)
+    tasks = [
+        (idx, stats, layout, args.output_dir, args.export_json, first_seen[digest] == idx)
+        for idx, ((layout, stats), digest) in enumerate(zip(all_exports, digests), start=1)
+    ]
+    # PNG writes go to a background thread so disk I/O overlaps the remaining renders
+    outputs = []
+    duplicates = []
+    writes = []
+    with ProcessPoolExecutor() as executor, ThreadPoolExecutor(max_workers=2) as writer_pool:
+        for digest, (png_file, png, json_file) in zip(digests, executor.map(_render_one, tasks)):
+            if png is None:
+                source_png, _ = outputs[first_seen[digest] - 1]
+                duplicates.append((source_png, png_file))
+            else:
+                writes.append(writer_pool.submit(write_bytes, png_file, png))
+            outputs.append((png_file, json_file))
+        # Surface any failed write before linking duplicates or reporting the files
+        for write in writes:
+            write.result()
+    for src, dst in duplicates:
+        link_or_copy(src, dst)
+    
+    for idx, ((score, layout), (_, stats), (png_file, json_file)) in enumerate(
+        zip(scored_layouts, all_exports, outputs), start=1
+    ):
         print(
-            f"Layout {idx}: Score={score:.1f} | A={stats['count_A']} B={stats['count_B']} | "
-            f"Area={stats['area']:.0f} m² | Buildings={len(layout)} | Valid={stats['valid']}"
+            f"Layout {idx}: Score={score:.1f} | A={stats.count_A} B={stats.count_B} | "
+            f"Area={stats.area:.0f} m² | Buildings={len(layout)} | Valid={stats.valid}"
         )
         print(f"  → PNG: {png_file}")
         if args.export_json:
@@ -88,7 +167,7 @@ def run(args: argparse.Namespace) -> None:
     print("Aggregate Statistics:")
     print(f"{'='*70}")
     avg_buildings = sum(len(layout) for _, layout in scored_layouts) / len(scored_layouts)
-    avg_area = sum(stats['area'] for _, stats in all_exports) / len(all_exports)
+    avg_area = sum(stats.area for _, stats in all_exports) / len(all_exports)
     avg_score = sum(score for score, _ in scored_layouts) / len(scored_layouts)
     print(f"  Average buildings per layout: {avg_buildings:.1f}")
     print(f"  Average built area: {avg_area:.0f} m²")
@@ -106,6 +185,7 @@ if __name__ == "__main__":
     parser.add_argument("--attempts-per-building", type=int, default=120, help="Placement retries per building")
     parser.add_argument("--fill-extra", type=int, default=2, help="Greedy extra buildings to try adding after a valid draft")
     parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to generate initial layouts")
     parser.add_argument("--output-dir", default="outputs", help="Directory to save plots")
     
     # Evolutionary optimization
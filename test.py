@@ -5,6 +5,7 @@ from typing import List
 from generator import collect_valid_layouts, generate_layout, summarize
 from geometry import layout_valid
 from config import NEIGHBOR_RADIUS
+from export import layout_digest, link_or_copy
 from viz import plot_layout
 
 
@@ -20,23 +21,30 @@ def test_scenario(name: str, output_dir: str, **gen_kwargs):
         print(f"❌ No valid layouts found for {name}")
         return
     
+    # Seeded scenarios regenerate the same layout on every try; render each distinct one once
+    rendered = {}
     for idx, layout in enumerate(layouts, start=1):
         stats = summarize(layout)
         outfile = os.path.join(output_dir, f"{name.replace(' ', '_').lower()}_{idx}.png")
-        plot_layout(layout, stats, outfile)
+        digest = layout_digest(layout)
+        if digest in rendered:
+            link_or_copy(rendered[digest], outfile)
+        else:
+            plot_layout(layout, stats, outfile, fast=True, dpi=72)
+            rendered[digest] = outfile
         
         violations = []
-        if not stats['rule_boundary']:
+        if not stats.rule_boundary:
             violations.append("boundary")
-        if not stats['rule_plaza']:
+        if not stats.rule_plaza:
             violations.append("plaza")
-        if not stats['rule_spacing']:
+        if not stats.rule_spacing:
             violations.append("spacing")
-        if not stats['rule_neighbor']:
+        if not stats.rule_neighbor:
             violations.append("neighbor-mix")
         
-        status = "✓ VALID" if stats['valid'] else f"✗ INVALID ({', '.join(violations)})"
-        print(f"  Layout {idx}: A={stats['count_A']}, B={stats['count_B']}, Area={stats['area']:.0f} m² - {status}")
+        status = "✓ VALID" if stats.valid else f"✗ INVALID ({', '.join(violations)})"
+        print(f"  Layout {idx}: A={stats.count_A}, B={stats.count_B}, Area={stats.area:.0f} m² - {status}")
         print(f"    Saved: {outfile}")
 
 
@@ -60,8 +68,8 @@ def generate_stress_test_layouts(output_dir: str):
         for idx, layout in enumerate(layouts, start=1):
             stats = summarize(layout)
             outfile = os.path.join(output_dir, f"stress_dense_{idx}.png")
-            plot_layout(layout, stats, outfile)
-            print(f"  Layout {idx}: A={stats['count_A']}, B={stats['count_B']}, Area={stats['area']:.0f} m² - ✓ VALID")
+            plot_layout(layout, stats, outfile, fast=True, dpi=72)
+            print(f"  Layout {idx}: A={stats.count_A}, B={stats.count_B}, Area={stats.area:.0f} m² - ✓ VALID")
             print(f"    Saved: {outfile}")
     else:
         print(f"  ❌ No dense layouts found (constraints too tight)")
@@ -85,8 +93,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_1 = summarize(manual_layout_1)
     outfile_1 = os.path.join(output_dir, "manual_basic_valid.png")
-    plot_layout(manual_layout_1, stats_1, outfile_1)
-    print(f"  Manual basic: A={stats_1['count_A']}, B={stats_1['count_B']}, Valid={stats_1['valid']}")
+    plot_layout(manual_layout_1, stats_1, outfile_1, dpi=72)
+    print(f"  Manual basic: A={stats_1.count_A}, B={stats_1.count_B}, Valid={stats_1.valid}")
     print(f"    Saved: {outfile_1}")
     
     # Case 2: Spacing violation (buildings too close)
@@ -99,8 +107,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_2 = summarize(manual_layout_2)
     outfile_2 = os.path.join(output_dir, "manual_spacing_violation.png")
-    plot_layout(manual_layout_2, stats_2, outfile_2)
-    print(f"  Spacing violation: A={stats_2['count_A']}, B={stats_2['count_B']}, Valid={stats_2['valid']}")
+    plot_layout(manual_layout_2, stats_2, outfile_2, dpi=72)
+    print(f"  Spacing violation: A={stats_2.count_A}, B={stats_2.count_B}, Valid={stats_2.valid}")
     print(f"    Saved: {outfile_2}")
     
     # Case 3: Plaza violation (building overlaps plaza)
@@ -113,8 +121,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_3 = summarize(manual_layout_3)
     outfile_3 = os.path.join(output_dir, "manual_plaza_violation.png")
-    plot_layout(manual_layout_3, stats_3, outfile_3)
-    print(f"  Plaza violation: A={stats_3['count_A']}, B={stats_3['count_B']}, Valid={stats_3['valid']}")
+    plot_layout(manual_layout_3, stats_3, outfile_3, dpi=72)
+    print(f"  Plaza violation: A={stats_3.count_A}, B={stats_3.count_B}, Valid={stats_3.valid}")
     print(f"    Saved: {outfile_3}")
     
     # Case 4: Neighbor-mix violation (Tower A far from all Bs)
@@ -127,8 +135,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_4 = summarize(manual_layout_4)
     outfile_4 = os.path.join(output_dir, "manual_neighbor_violation.png")
-    plot_layout(manual_layout_4, stats_4, outfile_4)
-    print(f"  Neighbor violation: A={stats_4['count_A']}, B={stats_4['count_B']}, Valid={stats_4['valid']}")
+    plot_layout(manual_layout_4, stats_4, outfile_4, dpi=72)
+    print(f"  Neighbor violation: A={stats_4.count_A}, B={stats_4.count_B}, Valid={stats_4.valid}")
     print(f"    Saved: {outfile_4}")
     
     # Case 5: Boundary violation (building outside setback)
@@ -141,8 +149,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_5 = summarize(manual_layout_5)
     outfile_5 = os.path.join(output_dir, "manual_boundary_violation.png")
-    plot_layout(manual_layout_5, stats_5, outfile_5)
-    print(f"  Boundary violation: A={stats_5['count_A']}, B={stats_5['count_B']}, Valid={stats_5['valid']}")
+    plot_layout(manual_layout_5, stats_5, outfile_5, dpi=72)
+    print(f"  Boundary violation: A={stats_5.count_A}, B={stats_5.count_B}, Valid={stats_5.valid}")
     print(f"    Saved: {outfile_5}")
     
     # Case 6: Multiple violations
@@ -155,8 +163,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_6 = summarize(manual_layout_6)
     outfile_6 = os.path.join(output_dir, "manual_multiple_violations.png")
-    plot_layout(manual_layout_6, stats_6, outfile_6)
-    print(f"  Multiple violations: A={stats_6['count_A']}, B={stats_6['count_B']}, Valid={stats_6['valid']}")
+    plot_layout(manual_layout_6, stats_6, outfile_6, dpi=72)
+    print(f"  Multiple violations: A={stats_6.count_A}, B={stats_6.count_B}, Valid={stats_6.valid}")
     print(f"    Saved: {outfile_6}")
     
     # Case 7: Dense valid layout
@@ -173,8 +181,8 @@ def generate_manual_test_cases(output_dir: str):
     
     stats_7 = summarize(manual_layout_7)
     outfile_7 = os.path.join(output_dir, "manual_dense_valid.png")
-    plot_layout(manual_layout_7, stats_7, outfile_7)
-    print(f"  Dense valid: A={stats_7['count_A']}, B={stats_7['count_B']}, Valid={stats_7['valid']}")
+    plot_layout(manual_layout_7, stats_7, outfile_7, dpi=72)
+    print(f"  Dense valid: A={stats_7.count_A}, B={stats_7.count_B}, Valid={stats_7.valid}")
     print(f"    Saved: {outfile_7}")
 
 
@@ -202,19 +210,19 @@ def generate_invalid_for_testing(output_dir: str):
         for idx, layout in enumerate(found_invalid, start=1):
             stats = summarize(layout)
             outfile = os.path.join(output_dir, f"invalid_test_{idx}.png")
-            plot_layout(layout, stats, outfile)
+            plot_layout(layout, stats, outfile, fast=True, dpi=72)
             
             violations = []
-            if not stats['rule_boundary']:
+            if not stats.rule_boundary:
                 violations.append("boundary")
-            if not stats['rule_plaza']:
+            if not stats.rule_plaza:
                 violations.append("plaza")
-            if not stats['rule_spacing']:
+            if not stats.rule_spacing:
                 violations.append("spacing")
-            if not stats['rule_neighbor']:
+            if not stats.rule_neighbor:
                 violations.append("neighbor-mix")
             
-            print(f"  Layout {idx}: A={stats['count_A']}, B={stats['count_B']}, Area={stats['area']:.0f} m² - INVALID ({', '.join(violations)})")
+            print(f"  Layout {idx}: A={stats.count_A}, B={stats.count_B}, Area={stats.area:.0f} m² - INVALID ({', '.join(violations)})")
             print(f"    Saved: {outfile}")
     else:
         print(f"  ❌ No invalid layouts found in {attempts} attempts (all passed validation)")
@@ -1,140 +1,286 @@
-import math
-from typing import Dict, List, Tuple
+import io
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib
+
+# plot_layout only writes files: lock the non-interactive backend before pyplot loads
+matplotlib.use("Agg")
+matplotlib.interactive(False)
 
 import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection, PatchCollection
+from matplotlib.colors import to_rgba
 from matplotlib.patches import Rectangle
+from PIL import Image
+
+plt.ioff()
+
+try:
+    import pyspng
+except ImportError:  # optional faster PNG encoder; Pillow is used otherwise
+    pyspng = None
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # optional; nearest-B lookup falls back to a NumPy argmin
+    cKDTree = None
 
 from config import MIN_SPACING, NEIGHBOR_RADIUS, PLAZA, SITE_HEIGHT, SITE_WIDTH
-from geometry import edge_distance, find_violations, rect_center
+from export import write_bytes
+from generator import LayoutStats
+from geometry import find_violations
 
 Rect = Dict[str, float]
 
 COLORS = {"A": "#1f77b4", "B": "#ff7f0e"}
+VIOLATION_COLOR = "#d62728"
+
+# Record dtype of layout_to_array; arr["x"] etc. read back as column views
+LAYOUT_DTYPE = np.dtype([("x", "f8"), ("y", "f8"), ("w", "f8"), ("h", "f8"), ("type", "U1")])
+
+# One figure per process. The site fixtures are drawn on it once; everything
+# plot_layout adds for a layout goes in _DYNAMIC and is removed on the next call.
+_FIG = None
+_AX = None
+_PLAZA_LABEL = None
+_DYNAMIC: List = []
+# Subplot params of the fresh figure; tight_layout starts from these on every call
+_SUBPLOT_PARAMS: Dict[str, float] = {}
+
+
+def layout_to_array(layout: List[Rect]) -> np.ndarray:
+    """Pack ``layout`` into a structured array with one ``LAYOUT_DTYPE`` record per rect."""
+    return np.array([(r["x"], r["y"], r["w"], r["h"], r["type"]) for r in layout], dtype=LAYOUT_DTYPE)
+
+
+def _pairwise_metrics(
+    arr: np.ndarray,
+) -> Tuple[Dict[int, Tuple[int, float, float]], List[Tuple[int, int, float]], List[Tuple[float, float]]]:
+    """Nearest neighbor of each rect, spacing-fail pairs and rect centers, without a full pair list.
 
+    ``nearest[i]`` is ``(j, center_dist, edge_dist)`` for the lowest-index j at
+    the smallest center distance. Spacing-fail pairs are ``(i, j, edge_dist)``
+    with i < j, matching ``find_violations``. Center distances only pick and
+    label neighbors, so they are computed in float32; edge distances decide
+    spacing violations and stay float64.
+    """
+    n = len(arr)
+    x, y, w, h = arr["x"], arr["y"], arr["w"], arr["h"]
+    cx, cy = x + w * 0.5, y + h * 0.5
+    centers = list(zip(cx.tolist(), cy.tolist()))
+    if n < 2:
+        return {}, [], centers
 
-def _pairwise_metrics(layout: List[Rect]) -> Tuple[List[Tuple[int, int, float, float]], List[Tuple[float, float]]]:
-    centers = [rect_center(r) for r in layout]
-    pairs: List[Tuple[int, int, float, float]] = []
-    for i, c1 in enumerate(centers):
-        for j in range(i + 1, len(layout)):
-            c2 = centers[j]
-            cdist = math.hypot(c1[0] - c2[0], c1[1] - c2[1])
-            edist = edge_distance(layout[i], layout[j])
-            pairs.append((i, j, cdist, edist))
-    return pairs, centers
-
-
-def _draw_line(ax, p1, p2, label: str, color: str, lw: float = 1.2, alpha: float = 0.7):
-    x_mid, y_mid = (p1[0] + p2[0]) * 0.5, (p1[1] + p2[1]) * 0.5
-    ax.plot([p1[0], p2[0]], [p1[1], p2[1]], color=color, lw=lw, alpha=alpha)
-    ax.text(x_mid, y_mid, label, ha="center", va="center", fontsize=7, color=color, bbox=dict(boxstyle="round,pad=0.2", fc="white", ec=color, alpha=0.8))
-
-
-def plot_layout(layout: List[Rect], stats: Dict[str, float], outfile: str) -> None:
-    fig, ax = plt.subplots(figsize=(10, 7))
-    ax.set_xlim(0, SITE_WIDTH)
-    ax.set_ylim(0, SITE_HEIGHT)
-    ax.set_aspect("equal")
-    ax.set_title("Generated Layout with Distances")
-
-    site_patch = Rectangle((0, 0), SITE_WIDTH, SITE_HEIGHT, fill=False, lw=2, color="#222")
-    ax.add_patch(site_patch)
-
-    plaza_patch = Rectangle((PLAZA["x"], PLAZA["y"]), PLAZA["w"], PLAZA["h"], color="#cccccc", alpha=0.5)
-    ax.add_patch(plaza_patch)
-    ax.text(
-        PLAZA["x"] + PLAZA["w"] * 0.5,
-        PLAZA["y"] + PLAZA["h"] * 0.5,
-        "Plaza",
-        ha="center",
-        va="center",
-        fontsize=10,
-        color="#333",
+    cx32, cy32 = cx.astype(np.float32), cy.astype(np.float32)
+    cdist = np.hypot(cx32[:, None] - cx32, cy32[:, None] - cy32)
+    dx = np.maximum(0.0, np.maximum(x - (x + w)[:, None], x[:, None] - (x + w)))
+    dy = np.maximum(0.0, np.maximum(y - (y + h)[:, None], y[:, None] - (y + h)))
+    edist = np.hypot(dx, dy)
+
+    np.fill_diagonal(cdist, np.inf)
+    rows = np.arange(n)
+    nearest_j = cdist.argmin(axis=1)
+    nearest = dict(
+        zip(
+            rows.tolist(),
+            zip(nearest_j.tolist(), cdist[rows, nearest_j].tolist(), edist[rows, nearest_j].tolist()),
+        )
     )
 
-    violations = find_violations(layout, NEIGHBOR_RADIUS)
-    spacing_fail_pairs = violations["spacing_fail_pairs"]
-    affected = violations["affected_indices"]
+    fail_i, fail_j = np.nonzero(np.triu(edist < MIN_SPACING, 1))
+    spacing_pairs = list(zip(fail_i.tolist(), fail_j.tolist(), edist[fail_i, fail_j].tolist()))
+    return nearest, spacing_pairs, centers
+
 
-    pairs, centers = _pairwise_metrics(layout)
-    nearest: Dict[int, Tuple[int, float, float]] = {}
-    for i, j, cdist, edist in pairs:
-        if i not in nearest or cdist < nearest[i][1]:
-            nearest[i] = (j, cdist, edist)
-        if j not in nearest or cdist < nearest[j][1]:
-            nearest[j] = (i, cdist, edist)
-
-    drawn_pairs = set()
-    for i, j, _, _ in pairs:
-        if nearest.get(i, (None,))[0] == j and i < j:
-            drawn_pairs.add((i, j))
-        if nearest.get(j, (None,))[0] == i and j < i:
-            drawn_pairs.add((j, i))
-
-    for idx, rect in enumerate(layout):
-        color = COLORS.get(rect["type"], "#2ca02c")
-        edge_color = "#d62728" if idx in affected else "#111111"
-        patch = Rectangle((rect["x"], rect["y"]), rect["w"], rect["h"], color=color, alpha=0.8, ec=edge_color, lw=2)
-        ax.add_patch(patch)
-        ax.text(
-            rect["x"] + rect["w"] * 0.5,
-            rect["y"] + rect["h"] * 0.5,
-            rect["type"],
+def _nearest_b(pts: np.ndarray, a_idx: np.ndarray, b_idx: np.ndarray) -> List[Tuple[int, int, float]]:
+    """``(a, b, center_dist)`` pairing every Tower A index in ``a_idx`` with its closest index in ``b_idx``."""
+    if not len(a_idx) or not len(b_idx):
+        return []
+    a_pts, b_pts = pts[a_idx], pts[b_idx]
+    if cKDTree is not None:
+        dists, locs = cKDTree(b_pts).query(a_pts, k=1)
+    else:
+        all_dists = np.hypot(a_pts[:, None, 0] - b_pts[:, 0], a_pts[:, None, 1] - b_pts[:, 1])
+        locs = all_dists.argmin(axis=1)
+        dists = all_dists[np.arange(len(a_idx)), locs]
+    return list(zip(a_idx.tolist(), b_idx[locs].tolist(), dists.tolist()))
+
+
+def _draw_lines(ax, centers: List[Tuple[float, float]], lines: List[Tuple]) -> List:
+    """Draw ``(i, j, label, color, lw, alpha)`` lines between rect centers as one LineCollection plus midpoint labels.
+
+    Lines joining the same pair of rects share one label holding all of their
+    texts, in the color of the last line drawn: the violation color (with a
+    boxed background) when any of them is a violation.
+    """
+    if not lines:
+        return []
+    # Violation lines go last so they sit on top of other lines joining the same pair
+    lines = sorted(lines, key=lambda line: line[3] == VIOLATION_COLOR)
+    collection = LineCollection(
+        [(centers[i], centers[j]) for i, j, *_ in lines],
+        colors=[to_rgba(color, alpha) for _, _, _, color, _, alpha in lines],
+        linewidths=[lw for *_, lw, _ in lines],
+        zorder=2,
+    )
+    ax.add_collection(collection, autolim=False)
+    labels: Dict[Tuple[int, int], Tuple[List[str], str]] = {}
+    for i, j, label, color, _, _ in lines:
+        key = (min(i, j), max(i, j))
+        texts = labels[key][0] if key in labels else []
+        labels[key] = (texts + [label], color)
+    artists = [collection]
+    for (i, j), (texts, color) in labels.items():
+        x_mid, y_mid = (centers[i][0] + centers[j][0]) * 0.5, (centers[i][1] + centers[j][1]) * 0.5
+        bbox = dict(boxstyle="round,pad=0.2", fc="white", ec=color, alpha=0.8) if color == VIOLATION_COLOR else None
+        artists.append(
+            ax.text(x_mid, y_mid, "\n".join(texts), ha="center", va="center", fontsize=7, color=color, bbox=bbox)
+        )
+    return artists
+
+
+def _encode_png(fig, dpi: int = 150) -> bytes:
+    """Rasterize ``fig`` with Agg and encode the RGBA buffer at a low compression level."""
+    fig.set_dpi(dpi)
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    if pyspng is not None:
+        return pyspng.encode(rgba, compress_level=1)
+    buf = io.BytesIO()
+    Image.fromarray(rgba).save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
+
+
+def _layout_axes():
+    """Return the process-wide figure and axes with the previous layout's artists removed."""
+    global _FIG, _AX, _PLAZA_LABEL
+    if _FIG is None:
+        _FIG, _AX = plt.subplots(figsize=(10, 7))
+        _SUBPLOT_PARAMS.update(vars(_FIG.subplotpars))
+        _AX.set_xlim(0, SITE_WIDTH)
+        _AX.set_ylim(0, SITE_HEIGHT)
+        _AX.set_aspect("equal")
+        _AX.add_patch(Rectangle((0, 0), SITE_WIDTH, SITE_HEIGHT, fill=False, lw=2, color="#222"))
+        _AX.add_patch(Rectangle((PLAZA["x"], PLAZA["y"]), PLAZA["w"], PLAZA["h"], color="#cccccc", alpha=0.5))
+        _PLAZA_LABEL = _AX.text(
+            PLAZA["x"] + PLAZA["w"] * 0.5,
+            PLAZA["y"] + PLAZA["h"] * 0.5,
+            "Plaza",
             ha="center",
             va="center",
-            fontsize=9,
-            color="white",
+            fontsize=10,
+            color="#333",
         )
+        _AX.set_xlabel("Meters (x)")
+        _AX.set_ylabel("Meters (y)")
+    else:
+        for artist in _DYNAMIC:
+            artist.remove()
+        _DYNAMIC.clear()
+    return _FIG, _AX
+
+
+def plot_layout(
+    layout: List[Rect],
+    stats: LayoutStats,
+    outfile: Optional[str] = None,
+    *,
+    fast: bool = False,
+    dpi: int = 150,
+) -> bytes:
+    """Render ``layout`` and return the PNG bytes, also writing them to ``outfile`` when given.
+
+    Pass ``outfile=None`` to hand the write off to the caller (e.g. a background
+    writer). ``fast=True`` draws only the site, plaza and colored buildings: no
+    title, labels, distance lines, legend or grid. Lower ``dpi`` for quick previews.
+    """
+    fig, ax = _layout_axes()
+    ax.set_title("" if fast else "Generated Layout with Distances")
+    _PLAZA_LABEL.set_visible(not fast)
+    ax.xaxis.label.set_visible(not fast)
+    ax.yaxis.label.set_visible(not fast)
+    if fast:
+        ax.grid(False)
+    else:
+        ax.grid(True, linestyle="--", alpha=0.3)
+
+    violations = find_violations(layout, NEIGHBOR_RADIUS)
+    affected = violations["affected_indices"]
+    arr = layout_to_array(layout)
+
+    buildings = PatchCollection(
+        [
+            Rectangle((x, y), w, h)
+            for x, y, w, h in zip(arr["x"].tolist(), arr["y"].tolist(), arr["w"].tolist(), arr["h"].tolist())
+        ],
+        facecolors=[COLORS.get(t, "#2ca02c") for t in arr["type"].tolist()],
+        edgecolors=[VIOLATION_COLOR if idx in affected else "#111111" for idx in range(len(arr))],
+        linewidths=2,
+        alpha=0.8,
+        match_original=False,
+    )
+    buildings.set_rasterized(True)
+    ax.add_collection(buildings)
+    _DYNAMIC.append(buildings)
+
+    if not fast:
+        _DYNAMIC.extend(_annotate(ax, arr, stats, violations))
+
+    # tight_layout refines the current axes position and depends on the dpi, so
+    # reset both first; otherwise the axes drift with every render on the reused figure.
+    fig.set_dpi(dpi)
+    fig.subplots_adjust(**_SUBPLOT_PARAMS)
+    fig.tight_layout()
+    png = _encode_png(fig, dpi=dpi)
+    if outfile is not None:
+        write_bytes(outfile, png)
+    return png
 
-    for i, j, dist in spacing_fail_pairs:
-        _draw_line(ax, centers[i], centers[j], f"{dist:.1f} m < {MIN_SPACING} m", "#d62728", lw=1.8, alpha=0.9)
 
-    for i, j in drawn_pairs:
-        _, _, edist = nearest[i]
-        _draw_line(ax, centers[i], centers[j], f"{edist:.1f} m", "#555555", lw=1.0, alpha=0.5)
+def _annotate(ax, arr: np.ndarray, stats: LayoutStats, violations: Dict) -> List:
+    """Draw building labels, distance lines, subtitle and legend; return the artists added."""
+    artists = []
+    nearest, spacing_pairs, centers = _pairwise_metrics(arr)
+    for (cx, cy), type_name in zip(centers, arr["type"].tolist()):
+        artists.append(ax.text(cx, cy, type_name, ha="center", va="center", fontsize=9, color="white"))
 
-    # Draw neighbor-mix radius lines for Tower A buildings
+    lines = []
+    for i, j, dist in spacing_pairs:
+        lines.append((i, j, f"{dist:.1f} m < {MIN_SPACING} m", VIOLATION_COLOR, 1.8, 0.9))
+
+    # Each rect's nearest-neighbor line is drawn once, from the lower index; a
+    # spacing violation on the same pair already shows its edge distance
+    failing = {(i, j) for i, j, _ in spacing_pairs}
+    for i, (j, _, edist) in nearest.items():
+        if i < j and (i, j) not in failing:
+            lines.append((i, j, f"{edist:.1f} m", "#555555", 1.0, 0.5))
+
+    # Draw neighbor-mix radius lines for Tower A buildings; the type partition is taken once
+    a_idx = np.flatnonzero(arr["type"] == "A")
+    b_idx = np.flatnonzero(arr["type"] == "B")
     neighbor_fail = violations["neighbor_fail"]
-    for idx, rect in enumerate(layout):
-        if rect["type"] != "A":
-            continue
-        # Find closest Tower B
-        closest_b_idx = None
-        closest_b_dist = float("inf")
-        for b_idx, b_rect in enumerate(layout):
-            if b_rect["type"] != "B":
-                continue
-            dist = math.hypot(centers[idx][0] - centers[b_idx][0], centers[idx][1] - centers[b_idx][1])
-            if dist < closest_b_dist:
-                closest_b_dist = dist
-                closest_b_idx = b_idx
-        
-        if closest_b_idx is not None:
-            is_violation = idx in neighbor_fail
-            color = "#d62728" if is_violation else "#9467bd"
-            label_text = f"A→B: {closest_b_dist:.1f} m" + (f" > {NEIGHBOR_RADIUS} m!" if is_violation else "")
-            _draw_line(ax, centers[idx], centers[closest_b_idx], label_text, color, lw=1.5, alpha=0.8)
-
-    status = "valid" if stats.get("valid", False) else "invalid"
+    for idx, closest_b_idx, closest_b_dist in _nearest_b(np.asarray(centers, dtype=np.float32), a_idx, b_idx):
+        is_violation = idx in neighbor_fail
+        color = VIOLATION_COLOR if is_violation else "#9467bd"
+        label_text = f"A→B: {closest_b_dist:.1f} m" + (f" > {NEIGHBOR_RADIUS} m!" if is_violation else "")
+        lines.append((idx, closest_b_idx, label_text, color, 1.5, 0.8))
+    artists += _draw_lines(ax, centers, lines)
+
+    status = "valid" if stats.valid else "invalid"
     subtitle = (
-        f"A: {stats['count_A']}  |  B: {stats['count_B']}  |  "
-        f"Area: {stats['area']:.0f} m²  |  Status: {status}  |  Min spacing: {MIN_SPACING} m"
+        f"A: {stats.count_A}  |  B: {stats.count_B}  |  "
+        f"Area: {stats.area:.0f} m²  |  Status: {status}  |  Min spacing: {MIN_SPACING} m"
     )
-    ax.text(0.02, 0.98, subtitle, transform=ax.transAxes, ha="left", va="top", fontsize=10, color="#111")
+    artists.append(ax.text(0.02, 0.98, subtitle, transform=ax.transAxes, ha="left", va="top", fontsize=10, color="#111"))
 
     legend_elements = [
         Rectangle((0, 0), 1, 1, color=COLORS["A"], alpha=0.8, label="Tower A (30x20)"),
         Rectangle((0, 0), 1, 1, color=COLORS["B"], alpha=0.8, label="Tower B (20x20)"),
         Rectangle((0, 0), 1, 1, color="#cccccc", alpha=0.5, label="Central plaza (40x40)"),
-        Rectangle((0, 0), 1, 1, color="#ffffff", ec="#d62728", lw=2, label="Rule violation"),
+        Rectangle((0, 0), 1, 1, color="#ffffff", ec=VIOLATION_COLOR, lw=2, label="Rule violation"),
         plt.Line2D([0], [0], color="#9467bd", lw=1.5, label=f"A→B neighbor ({NEIGHBOR_RADIUS}m radius)"),
     ]
-    ax.legend(handles=legend_elements, loc="upper right")
+    artists.append(ax.legend(handles=legend_elements, loc="upper right"))
+    return artists
 
-    ax.set_xlabel("Meters (x)")
-    ax.set_ylabel("Meters (y)")
-    ax.grid(True, linestyle="--", alpha=0.3)
-
-    fig.tight_layout()
-    fig.savefig(outfile, dpi=150)
-    plt.close(fig)